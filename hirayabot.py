@@ -1,46 +1,193 @@
 import discord
 from discord.ext import commands
 from discord import ui
-from discord.utils import escape_mentions
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import astuple, dataclass, fields, replace
 from datetime import datetime, timedelta
-import json
+from typing import Optional
+import orjson
 import os
 import asyncio
-import re
+import base64
+import itertools
+import sqlite3
+import zstandard as zstd
+
+try:
+    import uvloop
+except ImportError:
+    # uvloop has no Windows build; the stock loop works, just slower
+    uvloop = None
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 if not TOKEN:
     raise RuntimeError("DISCORD_TOKEN environment variable is not set.")
 
-DATA_FILE = "confessions.json"
+DATA_FILE = "confessions.json.zst"
+LEGACY_DATA_FILE = "confessions.json"
+WAL_FILE = "confessions.wal"
+DB_FILE = "confessions.db"
+WAL_BATCH_MAX = 256
+COMPACT_INTERVAL_SECONDS = 600
+COMPACT_EVERY_EVENTS = 1000
 
-CONF_ID_RE = re.compile(r"#(\d+)")
-SUGG_ID_RE = re.compile(r"#(\d+)")
-data_lock = asyncio.Lock()
 
-PENDING_IMAGE = {}
-PENDING_IMAGE_LOCK = asyncio.Lock()
+# insertion-ordered with a fixed TTL, so the oldest entry is always the next to expire
+PENDING_IMAGE: OrderedDict = OrderedDict()
 PENDING_IMAGE_TTL_SECONDS = 60 * 30
+PENDING_IMAGE_MAX = 10_000
+# (guild_id, channel_id, user_id) -> pending suggestion message ids, oldest first
+PENDING_BY_USER: dict = {}
+
+STATUS_FIELD_IDX = 0
+VOTES_FIELD_IDX = 1
+VOTE_EDIT_DELAY_SECONDS = 0.5
+
+CONFESSION_FOOTER_TEXT = "Reply anonymously using the button below."
+MENTION_SCRUB = str.maketrans({"@": "@\u200b"})
+
+flush_queue: asyncio.Queue = asyncio.Queue()
+log_queue: asyncio.Queue = asyncio.Queue()
+_dirty = asyncio.Event()
+_compact_now = asyncio.Event()
+_events_since_snapshot = 0
+_dirty_suggestions: dict = {}
+_vote_edits: dict = {}
+# bumped by add_suggestion; rebuildsuggestmap skips its scan when nothing was added since the last run
+_suggestions_gen = 0
+_suggestion_map_gen = None
+_wal_fh = None
+# every WAL append, SQLite commit and snapshot write runs on this one thread, in queue order
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hira-io")
+
+_zstd_c = zstd.ZstdCompressor(level=3)
+_zstd_d = zstd.ZstdDecompressor()
+
+
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS confessions (
+    cid INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    message_id INTEGER,
+    user_id INTEGER,
+    username TEXT,
+    account_created TEXT,
+    content TEXT,
+    timestamp TEXT,
+    jump_url TEXT,
+    thread_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_confessions_message ON confessions(message_id);
+CREATE TABLE IF NOT EXISTS replies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cid INTEGER NOT NULL,
+    content TEXT,
+    user_id INTEGER,
+    username TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_replies_cid ON replies(cid);
+"""
+
+
+@dataclass(slots=True)
+class Confession:
+    cid: int
+    guild_id: int
+    channel_id: int
+    message_id: int
+    user_id: int
+    username: str
+    account_created: str
+    content: str
+    timestamp: str
+    jump_url: str
+    thread_id: Optional[int] = None
+
+
+CONFESSION_FIELDS = tuple(f.name for f in fields(Confession))
+
+
+@dataclass(slots=True)
+class Suggestion:
+    guild_id: int
+    title: str
+    content: str
+    user_id: int
+    username: str
+    timestamp: str
+    message_id: int
+    channel_id: int
+    jump_url: str
+    upvotes: set
+    downvotes: set
+    status: str = "pending"
+    image_url: Optional[str] = None
+
+
+SUGGESTION_FIELDS = frozenset(f.name for f in fields(Suggestion))
+_INSERT_CONFESSION_SQL = (
+    f"INSERT OR REPLACE INTO confessions ({', '.join(CONFESSION_FIELDS)}) "
+    f"VALUES ({', '.join('?' * len(CONFESSION_FIELDS))})"
+)
+
+
+HOT_CONFESSIONS_MAX = 5000
+_hot_confessions: OrderedDict = OrderedDict()
+
+
+def remember_confession(rec: Confession):
+    _hot_confessions[rec.cid] = rec
+    _hot_confessions.move_to_end(rec.cid)
+    if len(_hot_confessions) > HOT_CONFESSIONS_MAX:
+        _hot_confessions.popitem(last=False)
+
+
+def load_confession(cid: int) -> Optional[Confession]:
+    rec = _hot_confessions.get(cid)
+    if rec is not None:
+        _hot_confessions.move_to_end(cid)
+        return rec
+    row = db.execute("SELECT * FROM confessions WHERE cid = ?", (cid,)).fetchone()
+    if row is None:
+        return None
+    rec = Confession(**row)
+    remember_confession(rec)
+    return rec
+
+
+def _open_db(check_same_thread=True):
+    conn = sqlite3.connect(DB_FILE, isolation_level=None, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(DB_SCHEMA)
+    return conn
 
 
 def _default_data():
     return {
-        "confession_count": 0,
-        "confessions": {},
-        "message_to_confession": {},
         "suggestion_count": 0,
         "suggestions": {},
         "message_to_suggestion": {},
-        "guild_config": {}
+        "guild_config": {},
+        "wal_seq": 0
     }
 
 
-def load_data():
-    if not os.path.exists(DATA_FILE):
+def _load_snapshot():
+    if os.path.exists(DATA_FILE):
+        path, compressed = DATA_FILE, True
+    elif os.path.exists(LEGACY_DATA_FILE):
+        path, compressed = LEGACY_DATA_FILE, False
+    else:
         return _default_data()
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(_zstd_d.decompress(raw) if compressed else raw)
         for k, v in _default_data().items():
             data.setdefault(k, v)
         if not isinstance(data.get("guild_config"), dict):
@@ -50,95 +197,513 @@ def load_data():
         return _default_data()
 
 
-def save_data_atomic(data):
-    tmp = DATA_FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-    os.replace(tmp, DATA_FILE)
+def _apply_op(data, op):
+    if op.get("op") == "put":
+        for path, value in op["puts"]:
+            target = data
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+    data["wal_seq"] = max(int(data.get("wal_seq", 0)), int(op.get("seq", 0)))
+
+
+def _replay_wal(data):
+    if not os.path.exists(WAL_FILE):
+        return data
+    # dirty suggestions take their seq when the flusher encodes them, so a batch can hold seq N+1
+    # ahead of seq N; only lines the snapshot already covers are skipped, never ones behind a later seq
+    applied = int(data.get("wal_seq", 0))
+    with open(WAL_FILE, "rb") as f:
+        for line in f:
+            try:
+                op = orjson.loads(line)
+            except ValueError:
+                # torn tail from a crash mid-append; everything after it is unusable
+                break
+            if int(op.get("seq", 0)) <= applied:
+                continue
+            _apply_op(data, op)
+    return data
+
+
+def _pack_ids(ids) -> str:
+    # sorted deltas as varints: gaps between voter snowflakes are ~2**50, so about 8 bytes
+    # (~11 base64 chars) per voter against ~20 for a JSON number, with no list punctuation
+    out = bytearray()
+    prev = 0
+    for i in sorted(ids):
+        delta, prev = i - prev, i
+        while delta >= 0x80:
+            out.append(delta & 0x7F | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return base64.b64encode(out).decode("ascii")
+
+
+def _unpack_ids(packed: str) -> set:
+    ids = set()
+    value = shift = prev = 0
+    for b in base64.b64decode(packed):
+        value |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+            continue
+        prev += value
+        ids.add(prev)
+        value = shift = 0
+    return ids
+
+
+def _load_ids(stored) -> set:
+    # voter sets are stored packed; plain lists are from older snapshots
+    if isinstance(stored, str):
+        return _unpack_ids(stored)
+    return set(stored or ())
+
+
+def _json_default(o):
+    if isinstance(o, set):
+        return _pack_ids(o)
+    raise TypeError
+
+
+def _int_keys(data):
+    for key in ("suggestions", "message_to_suggestion", "guild_config"):
+        data[key] = {int(k): v for k, v in data[key].items()}
+    return data
+
+
+def _load_suggestion(stored: dict) -> Suggestion:
+    rec = {k: v for k, v in stored.items() if k in SUGGESTION_FIELDS}
+    rec["upvotes"] = _load_ids(stored.get("upvotes"))
+    rec["downvotes"] = _load_ids(stored.get("downvotes"))
+    return Suggestion(**rec)
+
+
+def load_data():
+    data = _int_keys(_replay_wal(_int_keys(_load_snapshot())))
+    data["suggestions"] = {sid: _load_suggestion(rec) for sid, rec in data["suggestions"].items()}
+    return data
+
+
+def _write_bytes_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # directories can't be opened for fsync on Windows; NTFS journals the rename itself
+    if os.name == "nt":
+        return
+    dfd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dfd)
+    finally:
+        os.close(dfd)
+
+
+def _append_wal(lines: list, sync: bool = True):
+    global _wal_fh
+    if _wal_fh is None:
+        _wal_fh = open(WAL_FILE, "ab")
+    _wal_fh.write(b"".join(lines))
+    _wal_fh.flush()
+    if sync:
+        os.fsync(_wal_fh.fileno())
+
+
+def save_data_atomic(data: dict):
+    raw = orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    _write_bytes_atomic(DATA_FILE, _zstd_c.compress(raw))
+    with open(WAL_FILE, "w", encoding="utf-8"):
+        pass
+
+
+def _apply_op_sql(conn: sqlite3.Connection, op: dict):
+    kind = op.get("op")
+    if kind == "add_conf":
+        conn.execute(_INSERT_CONFESSION_SQL, astuple(op["rec"]))
+    elif kind == "add_reply":
+        reply = op["reply"]
+        conn.execute(
+            "INSERT INTO replies (cid, content, user_id, username, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (int(op["cid"]), reply.get("content"), reply.get("user_id"), reply.get("username"), reply.get("timestamp"))
+        )
+    elif kind == "set_thread":
+        conn.execute("UPDATE confessions SET thread_id = ? WHERE cid = ?", (op["thread_id"], int(op["cid"])))
+    elif kind == "reindex":
+        conn.execute("REINDEX idx_confessions_message")
+
+
+def _count_mapped_confessions() -> int:
+    return db_writer.execute("SELECT COUNT(*) FROM confessions WHERE message_id IS NOT NULL").fetchone()[0]
+
+
+def db_apply(ops: list):
+    db_writer.execute("BEGIN")
+    try:
+        for op in ops:
+            _apply_op_sql(db_writer, op)
+    except Exception:
+        db_writer.execute("ROLLBACK")
+        raise
+    db_writer.execute("COMMIT")
+
+
+def _run_io(func, *args):
+    return asyncio.get_running_loop().run_in_executor(_io_executor, func, *args)
+
+
+def _enqueue_write(kind: str, payload) -> asyncio.Future:
+    fut = asyncio.get_running_loop().create_future()
+    flush_queue.put_nowait((kind, payload, fut))
+    return fut
+
 
+def commit_op(op: dict) -> asyncio.Future:
+    return _enqueue_write("op", op)
 
+
+def _encode_event(puts: dict) -> bytes:
+    global _events_since_snapshot
+    seq = next(_event_seq)
+    DATA["wal_seq"] = seq
+    _events_since_snapshot += 1
+    _dirty.set()
+    if _events_since_snapshot >= COMPACT_EVERY_EVENTS:
+        _compact_now.set()
+    line = orjson.dumps({"op": "put", "seq": seq, "puts": [[list(path), value] for path, value in puts.items()]}, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return line + b"\n"
+
+
+def log_event(puts: dict, sync: bool = True) -> asyncio.Future:
+    # call right after mutating DATA, with no await in between, so WAL order matches snapshot order.
+    # sync=False is for data that can be rebuilt: the line reaches the page cache but skips fsync,
+    # so a power loss may drop it (and only it; the next synced batch or snapshot covers it)
+    return _enqueue_write("event" if sync else "lazy_event", _encode_event(puts))
+
+
+def add_suggestion(sid: int, rec: Suggestion) -> asyncio.Future:
+    global _suggestions_gen
+    # the reverse map is kept in step with every insert; rebuildsuggestmap is only a repair tool
+    _suggestions_gen += 1
+    DATA["suggestions"][sid] = rec
+    DATA["message_to_suggestion"][rec.message_id] = sid
+    return log_event({
+        ("suggestions", sid): rec,
+        ("message_to_suggestion", rec.message_id): sid
+    })
+
+
+def touch_suggestion(sid: int) -> asyncio.Future:
+    # repeated edits to one suggestion share a queue slot; the record is encoded once when the flusher reaches it
+    fut = _dirty_suggestions.get(sid)
+    if fut is None:
+        fut = _dirty_suggestions[sid] = _enqueue_write("suggestion", sid)
+    _dirty.set()
+    return fut
+
+
+def _snapshot_view() -> dict:
+    # copies every mutable container so the writer thread can encode it while handlers keep mutating DATA
+    view = dict(DATA)
+    view["suggestions"] = {
+        sid: replace(rec, upvotes=rec.upvotes.copy(), downvotes=rec.downvotes.copy())
+        for sid, rec in DATA["suggestions"].items()
+    }
+    view["message_to_suggestion"] = dict(DATA["message_to_suggestion"])
+    view["guild_config"] = {gid: dict(cfg) for gid, cfg in DATA["guild_config"].items()}
+    return view
+
+
+async def flush_data():
+    global _events_since_snapshot
+    if not _dirty.is_set():
+        return
+    _dirty.clear()
+    _compact_now.clear()
+    _dirty_suggestions.clear()
+    _events_since_snapshot = 0
+    await _enqueue_write("snapshot", _snapshot_view())
+
+
+async def _snapshot_flusher():
+    while True:
+        await _dirty.wait()
+        try:
+            await asyncio.wait_for(_compact_now.wait(), COMPACT_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await flush_data()
+        except Exception as e:
+            print(f"⚠️ Failed to save data: {e}")
+
+
+async def _wal_flusher():
+    while True:
+        batch = [await flush_queue.get()]
+        while len(batch) < WAL_BATCH_MAX and batch[-1][0] != "snapshot":
+            try:
+                batch.append(flush_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        ops = [payload for kind, payload, _ in batch if kind == "op"]
+        events = []
+        sync = False
+        try:
+            for kind, payload, fut in batch:
+                if kind in ("event", "lazy_event"):
+                    events.append(payload)
+                    sync = sync or kind == "event"
+                elif kind == "suggestion":
+                    if _dirty_suggestions.get(payload) is fut:
+                        del _dirty_suggestions[payload]
+                    rec = DATA["suggestions"].get(payload)
+                    if rec is not None:
+                        events.append(_encode_event({("suggestions", payload): rec}))
+                        sync = True
+            if ops:
+                await _run_io(db_apply, ops)
+            if events:
+                await _run_io(_append_wal, events, sync)
+            if batch[-1][0] == "snapshot":
+                await _run_io(save_data_atomic, batch[-1][1])
+        except Exception as e:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_result(None)
+
+
+def _migrate_confessions(data):
+    confessions = data.pop("confessions", None)
+    if confessions:
+        # the import is one transaction; rows already present mean an earlier boot committed it
+        # and crashed before rewriting the snapshot, and re-running it would duplicate every reply
+        if db_writer.execute("SELECT 1 FROM confessions LIMIT 1").fetchone() is None:
+            ops = []
+            for cid, rec in confessions.items():
+                values = {k: rec.get(k) for k in CONFESSION_FIELDS if k != "cid"}
+                ops.append({"op": "add_conf", "rec": Confession(cid=int(cid), **values)})
+                ops.extend({"op": "add_reply", "cid": int(cid), "reply": reply} for reply in rec.get("replies", []))
+            db_apply(ops)
+        data.pop("message_to_confession", None)
+        save_data_atomic(data)
+    return int(data.get("confession_count", 0))
+
+
+def _compact_wal(data):
+    # fold the replayed WAL into a snapshot so new appends never land behind a torn tail
+    if os.path.exists(WAL_FILE) and os.path.getsize(WAL_FILE):
+        save_data_atomic(data)
+
+
+db = _open_db()
+db_writer = _open_db(check_same_thread=False)
 DATA = load_data()
+_event_seq = itertools.count(int(DATA["wal_seq"]) + 1)
+
+_confession_counter = itertools.count(max(
+    _migrate_confessions(DATA),
+    db.execute("SELECT COALESCE(MAX(cid), 0) FROM confessions").fetchone()[0]
+) + 1)
+_compact_wal(DATA)
+_channel_cache: dict = {}
+_thread_cache: OrderedDict = OrderedDict()
+THREAD_CACHE_MAX = 1024
+
+
+def _cache_thread(thread: discord.Thread):
+    _thread_cache[thread.id] = thread
+    _thread_cache.move_to_end(thread.id)
+    if len(_thread_cache) > THREAD_CACHE_MAX:
+        _thread_cache.popitem(last=False)
+
+
+def _get_thread(guild: discord.Guild, thread_id: int):
+    thread = _thread_cache.get(thread_id)
+    if thread is not None:
+        _thread_cache.move_to_end(thread_id)
+        return thread
+    thread = guild.get_thread(thread_id)
+    if thread is not None:
+        _cache_thread(thread)
+    return thread
 
 
 def get_guild_cfg(guild_id: int):
-    return DATA["guild_config"].setdefault(str(guild_id), {})
+    return DATA["guild_config"].setdefault(guild_id, {})
 
 
-def set_guild_cfg(guild_id: int, **kwargs):
+def set_guild_cfg(guild_id: int, **kwargs) -> asyncio.Future:
     cfg = get_guild_cfg(guild_id)
     for k, v in kwargs.items():
         cfg[k] = v
+        _channel_cache.pop((guild_id, k), None)
+    return log_event({("guild_config", guild_id, k): v for k, v in kwargs.items()})
+
+
+def cached_channel(guild: discord.Guild, key: str):
+    channel = _channel_cache.get((guild.id, key))
+    if channel is None:
+        channel_id = get_guild_cfg(guild.id).get(key)
+        channel = guild.get_channel(int(channel_id)) if channel_id else None
+        if channel is not None:
+            _channel_cache[(guild.id, key)] = channel
+    return channel
+
+
+STATUS_LABELS = {
+    "pending": "🟨 Pending Review",
+    "approved": "🟩 Approved",
+    "denied": "🟥 Denied",
+    "implemented": "✅ Implemented",
+}
+STATUS_OPTIONS = [
+    discord.SelectOption(label="Pending Review", value="pending", emoji="🟨"),
+    discord.SelectOption(label="Approved", value="approved", emoji="🟩"),
+    discord.SelectOption(label="Denied", value="denied", emoji="🟥"),
+    discord.SelectOption(label="Implemented", value="implemented", emoji="✅"),
+]
 
 
 def status_label(status: str):
-    return {
-        "pending": "🟨 Pending Review",
-        "approved": "🟩 Approved",
-        "denied": "🟥 Denied",
-        "implemented": "✅ Implemented",
-    }.get(status, "🟨 Pending Review")
-
-
-def _rebuild_embed_from(embed: discord.Embed, *, fields, footer_text=None):
-    new_embed = discord.Embed(
-        title=embed.title,
-        description=embed.description,
-        color=embed.color.value if embed.color else 0xEB459E,
-        timestamp=embed.timestamp
-    )
-    if embed.author and embed.author.name:
-        try:
-            new_embed.set_author(name=embed.author.name, icon_url=embed.author.icon_url)
-        except Exception:
-            new_embed.set_author(name=embed.author.name)
-    if embed.thumbnail and embed.thumbnail.url:
-        new_embed.set_thumbnail(url=embed.thumbnail.url)
-    if embed.image and embed.image.url:
-        new_embed.set_image(url=embed.image.url)
-    if footer_text is None:
-        if embed.footer and embed.footer.text:
-            new_embed.set_footer(text=embed.footer.text)
+    return STATUS_LABELS.get(status, STATUS_LABELS["pending"])
+
+
+def votes_label(up: int, down: int):
+    return f"👍 {up}  |  👎 {down}"
+
+
+def _ts(dt: datetime) -> str:
+    return dt.isoformat(sep=" ", timespec="seconds")[:19]
+
+
+def _extract_id(title: str) -> Optional[int]:
+    _, sep, tail = title.rpartition("#")
+    if not sep:
+        return None
+    try:
+        return int(tail.partition(")")[0])
+    except ValueError:
+        return None
+
+
+def _set_known_field(embed: discord.Embed, index: int, name: str, value: str) -> bool:
+    fields = embed.fields
+    if index < len(fields) and fields[index].name == name:
+        embed.set_field_at(index, name=name, value=value, inline=True)
+        return True
+    for i, field in enumerate(fields):
+        if field.name.lower() == name.lower():
+            embed.set_field_at(i, name=name, value=value, inline=True)
+            return True
+    return False
+
+
+def _build_map(records):
+    return {rec.message_id: rid for rid, rec in records if rec.message_id}
+
+
+async def _send_quietly(send, **kwargs):
+    try:
+        await send(**kwargs)
+    except Exception:
+        pass
+
+
+def _refresh_suggestion_embed(embed: discord.Embed, rec: Suggestion):
+    _set_known_field(embed, STATUS_FIELD_IDX, "Status", f"**{status_label(rec.status)}**")
+    votes_value = votes_label(len(rec.upvotes), len(rec.downvotes))
+    if not _set_known_field(embed, VOTES_FIELD_IDX, "Votes", votes_value):
+        embed.add_field(name="Votes", value=votes_value, inline=True)
+    if rec.image_url:
+        embed.set_image(url=rec.image_url)
+
+
+def schedule_vote_edit(sid: int, message: discord.Message, embed: discord.Embed):
+    # a burst of clicks on one suggestion becomes a single edit carrying the counts as of the flush
+    entry = _vote_edits.get(message.id)
+    if entry is None:
+        _vote_edits[message.id] = [sid, message, embed, asyncio.create_task(_flush_vote_edit(message.id))]
     else:
-        new_embed.set_footer(text=footer_text)
-    for name, value, inline in fields[:25]:
-        new_embed.add_field(name=name, value=value, inline=inline)
-    return new_embed
-
-
-async def _clean_expired_pending():
-    async with PENDING_IMAGE_LOCK:
-        now = datetime.utcnow().timestamp()
-        expired = [k for k, v in PENDING_IMAGE.items() if v["expires_at"] <= now]
-        for k in expired:
-            PENDING_IMAGE.pop(k, None)
-
-
-async def _set_pending_image(guild_id: int, suggestion_channel_id: int, suggestion_message_id: int, user_id: int):
-    async with PENDING_IMAGE_LOCK:
-        PENDING_IMAGE[(guild_id, suggestion_message_id)] = {
-            "guild_id": guild_id,
-            "channel_id": suggestion_channel_id,
-            "message_id": suggestion_message_id,
-            "user_id": user_id,
-            "created_at": datetime.utcnow().timestamp(),
-            "expires_at": (datetime.utcnow() + timedelta(seconds=PENDING_IMAGE_TTL_SECONDS)).timestamp()
-        }
+        entry[1], entry[2] = message, embed
+
+
+async def _flush_vote_edit(message_id: int):
+    await asyncio.sleep(VOTE_EDIT_DELAY_SECONDS)
+    sid, message, embed, _ = _vote_edits.pop(message_id)
+    rec = DATA["suggestions"].get(sid)
+    if rec is None:
+        return
+    _refresh_suggestion_embed(embed, rec)
+    await _send_quietly(message.edit, embed=embed, view=bot.suggestion_view)
+
+
+def post_log(channel, embed: discord.Embed):
+    # log embeds are fire-and-forget; handlers never wait on the log channel's round-trip or rate limit
+    log_queue.put_nowait((channel, embed))
+
+
+async def _log_sender():
+    while True:
+        channel, embed = await log_queue.get()
+        await _send_quietly(channel.send, embed=embed)
+
+
+def _drop_pending(key):
+    entry = PENDING_IMAGE.pop(key, None)
+    if entry is not None:
+        user_key = (entry["guild_id"], entry["channel_id"], entry["user_id"])
+        mids = PENDING_BY_USER.get(user_key)
+        if mids:
+            mids.remove(entry["message_id"])
+            if not mids:
+                del PENDING_BY_USER[user_key]
+    return entry
+
+
+def _clean_expired_pending():
+    now = discord.utils.utcnow().timestamp()
+    while PENDING_IMAGE:
+        key = next(iter(PENDING_IMAGE))
+        if PENDING_IMAGE[key]["expires_at"] > now:
+            break
+        _drop_pending(key)
+
+
+def _set_pending_image(guild_id: int, suggestion_channel_id: int, suggestion_message_id: int, sid: int, user_id: int, embed: discord.Embed):
+    now = discord.utils.utcnow()
+    key = (guild_id, suggestion_message_id)
+    _drop_pending(key)
+    PENDING_IMAGE[key] = {
+        "guild_id": guild_id,
+        "channel_id": suggestion_channel_id,
+        "message_id": suggestion_message_id,
+        "sid": sid,
+        "user_id": user_id,
+        "embed": embed,
+        "created_at": now.timestamp(),
+        "expires_at": (now + timedelta(seconds=PENDING_IMAGE_TTL_SECONDS)).timestamp()
+    }
+    PENDING_BY_USER.setdefault((guild_id, suggestion_channel_id, user_id), []).append(suggestion_message_id)
+    if len(PENDING_IMAGE) > PENDING_IMAGE_MAX:
+        _drop_pending(next(iter(PENDING_IMAGE)))
 
 
-async def _clear_pending_image(guild_id: int, suggestion_message_id: int):
-    async with PENDING_IMAGE_LOCK:
-        PENDING_IMAGE.pop((guild_id, suggestion_message_id), None)
+def _clear_pending_image(guild_id: int, suggestion_message_id: int):
+    _drop_pending((guild_id, suggestion_message_id))
 
 
-async def _find_pending_for_user(guild_id: int, channel_id: int, user_id: int):
-    await _clean_expired_pending()
-    async with PENDING_IMAGE_LOCK:
-        matches = []
-        for (g, mid), v in PENDING_IMAGE.items():
-            if g == guild_id and v["channel_id"] == channel_id and v["user_id"] == user_id:
-                matches.append(v)
-        matches.sort(key=lambda x: x.get("created_at", 0), reverse=True)
-        return matches
+def _find_pending_for_user(guild_id: int, channel_id: int, user_id: int):
+    mids = PENDING_BY_USER.get((guild_id, channel_id, user_id))
+    return PENDING_IMAGE[(guild_id, mids[-1])] if mids else None
 
 
 class ConfessionModal(ui.Modal, title="Submit an Anonymous Confession"):
@@ -155,75 +720,81 @@ class ConfessionModal(ui.Modal, title="Submit an Anonymous Confession"):
             return await interaction.response.send_message("❌ Use this inside a server.", ephemeral=True)
 
         guild = interaction.guild
-        async with data_lock:
-            cfg = get_guild_cfg(guild.id)
-            confession_channel_id = cfg.get("confession_channel_id")
-            log_channel_id = cfg.get("log_channel_id")
+        cfg = get_guild_cfg(guild.id)
+        confession_channel_id = cfg.get("confession_channel_id")
 
         if not confession_channel_id:
             return await interaction.response.send_message("❌ Confession panel not set. Run `!panel` in the channel you want.", ephemeral=True)
 
-        confession_channel = guild.get_channel(int(confession_channel_id))
-        log_channel = guild.get_channel(int(log_channel_id)) if log_channel_id else None
+        confession_channel = cached_channel(guild, "confession_channel_id")
+        log_channel = cached_channel(guild, "log_channel_id")
 
         if confession_channel is None:
             return await interaction.response.send_message("❌ Confession channel not found. Run `!panel` again.", ephemeral=True)
 
-        text = escape_mentions(self.confession.value).strip()
+        text = self.confession.value.strip().translate(MENTION_SCRUB)
         if not text:
             return await interaction.response.send_message("❌ Empty confession.", ephemeral=True)
 
-        async with data_lock:
-            DATA["confession_count"] += 1
-            cid = int(DATA["confession_count"])
-
-        confession_embed = discord.Embed(
-            title=f"Anonymous Confession (#{cid})",
-            description=f"“{text}”",
-            color=0x5865F2,
-            timestamp=datetime.utcnow()
+        user = interaction.user
+        user_str = str(user)
+        uid = user.id
+        created_str = user.created_at.date().isoformat()
+        avatar_url = user.display_avatar.url
+
+        cid = next(_confession_counter)
+        now = discord.utils.utcnow()
+        now_iso = now.isoformat()
+
+        confession_embed = discord.Embed.from_dict({
+            "title": f"Anonymous Confession (#{cid})",
+            "description": f"“{text}”",
+            "color": 0x5865F2,
+            "timestamp": now_iso,
+            "footer": {"text": CONFESSION_FOOTER_TEXT}
+        })
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        msg = await confession_channel.send(embed=confession_embed, view=interaction.client.confession_view)
+
+        rec = Confession(
+            cid=cid,
+            guild_id=guild.id,
+            channel_id=confession_channel.id,
+            message_id=msg.id,
+            user_id=uid,
+            username=user_str,
+            account_created=created_str,
+            content=text,
+            timestamp=_ts(now),
+            jump_url=msg.jump_url
         )
-        confession_embed.set_footer(text="Reply anonymously using the button below.")
-
-        msg = await confession_channel.send(embed=confession_embed, view=ConfessionPersistentView())
-
-        async with data_lock:
-            DATA["confessions"][str(cid)] = {
-                "content": text,
-                "user_id": interaction.user.id,
-                "username": str(interaction.user),
-                "account_created": interaction.user.created_at.strftime("%Y-%m-%d"),
-                "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                "message_id": msg.id,
-                "channel_id": confession_channel.id,
-                "guild_id": guild.id,
-                "jump_url": msg.jump_url,
-                "thread_id": None,
-                "replies": []
-            }
-            DATA["message_to_confession"][str(msg.id)] = cid
-            save_data_atomic(DATA)
+        remember_confession(rec)
 
+        pending = [
+            commit_op({"op": "add_conf", "rec": rec}),
+            interaction.followup.send("✅ Confession submitted anonymously.", ephemeral=True)
+        ]
         if log_channel:
-            log_embed = discord.Embed(
-                title=f"🔒 Confession #{cid} — Log",
-                color=0xED4245,
-                timestamp=datetime.utcnow()
-            )
-            log_embed.add_field(name="Server", value=f"{guild.name} (`{guild.id}`)", inline=False)
-            log_embed.add_field(name="User", value=f"{interaction.user} (`{interaction.user.id}`)", inline=False)
-            log_embed.add_field(name="Account Created", value=interaction.user.created_at.strftime("%Y-%m-%d"), inline=True)
-            if isinstance(interaction.user, discord.Member) and interaction.user.joined_at:
-                log_embed.add_field(name="Joined Server", value=interaction.user.joined_at.strftime("%Y-%m-%d"), inline=True)
-            log_embed.add_field(name="Confession", value=text[:1024], inline=False)
-            log_embed.add_field(name="Message Link", value=f"[Jump]({msg.jump_url})", inline=False)
-            log_embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            try:
-                await log_channel.send(embed=log_embed)
-            except Exception:
-                pass
-
-        await interaction.response.send_message("✅ Confession submitted anonymously.", ephemeral=True)
+            fields = [
+                {"name": "Server", "value": f"{guild.name} (`{guild.id}`)", "inline": False},
+                {"name": "User", "value": f"{user_str} (`{uid}`)", "inline": False},
+                {"name": "Account Created", "value": created_str, "inline": True},
+            ]
+            if isinstance(user, discord.Member) and user.joined_at:
+                fields.append({"name": "Joined Server", "value": user.joined_at.date().isoformat(), "inline": True})
+            fields.append({"name": "Confession", "value": text[:1024], "inline": False})
+            fields.append({"name": "Message Link", "value": f"[Jump]({rec.jump_url})", "inline": False})
+            log_embed = discord.Embed.from_dict({
+                "title": f"🔒 Confession #{cid} — Log",
+                "color": 0xED4245,
+                "timestamp": now_iso,
+                "fields": fields,
+                "thumbnail": {"url": avatar_url}
+            })
+            post_log(log_channel, log_embed)
+
+        await asyncio.gather(*pending)
 
 
 class ReplyModal(ui.Modal, title="Reply Anonymously"):
@@ -245,94 +816,98 @@ class ReplyModal(ui.Modal, title="Reply Anonymously"):
             return await interaction.response.send_message("❌ Use this inside a server.", ephemeral=True)
 
         guild = interaction.guild
-        async with data_lock:
-            cfg = get_guild_cfg(guild.id)
-            confession_channel_id = cfg.get("confession_channel_id")
-            log_channel_id = cfg.get("log_channel_id")
-
-        confession_channel = guild.get_channel(int(confession_channel_id)) if confession_channel_id else None
-        log_channel = guild.get_channel(int(log_channel_id)) if log_channel_id else None
+        confession_channel = cached_channel(guild, "confession_channel_id")
+        log_channel = cached_channel(guild, "log_channel_id")
 
-        text = escape_mentions(self.reply.value).strip()
+        text = self.reply.value.strip().translate(MENTION_SCRUB)
         if not text:
             return await interaction.response.send_message("❌ Empty reply.", ephemeral=True)
 
+        user = interaction.user
+        user_str = str(user)
+        uid = user.id
+        avatar_url = user.display_avatar.url
+
         cid = int(self.confession_id)
+        now = discord.utils.utcnow()
+        now_iso = now.isoformat()
+
+        rec = load_confession(cid)
+        if not rec:
+            return await interaction.response.send_message("❌ Confession not found.", ephemeral=True)
+
+        reply_obj = {
+            "content": text,
+            "timestamp": _ts(now),
+            "user_id": uid,
+            "username": user_str
+        }
+        await asyncio.gather(
+            commit_op({"op": "add_reply", "cid": cid, "reply": reply_obj}),
+            interaction.response.defer(ephemeral=True, thinking=True)
+        )
+
+        reply_embed = discord.Embed.from_dict({
+            "title": f"Anonymous Reply → Confession #{cid}",
+            "description": f"“{text}”",
+            "color": 0x99AAB5,
+            "timestamp": now_iso
+        })
+        pending = [self._post_reply(guild, cid, rec, reply_embed, confession_channel)]
+
+        if log_channel:
+            log_embed = discord.Embed.from_dict({
+                "title": f"🔒 Reply to Confession #{cid} — Log",
+                "color": 0xFEE75C,
+                "timestamp": now_iso,
+                "fields": [
+                    {"name": "Server", "value": f"{guild.name} (`{guild.id}`)", "inline": False},
+                    {"name": "User", "value": f"{user_str} (`{uid}`)", "inline": False},
+                    {"name": "Reply", "value": text[:1024], "inline": False},
+                    {
+                        "name": "Confession Link",
+                        "value": f"[Jump]({rec.jump_url or self.confession_message.jump_url})",
+                        "inline": False
+                    },
+                ],
+                "thumbnail": {"url": avatar_url}
+            })
+            post_log(log_channel, log_embed)
+
+        posted_somewhere, *_ = await asyncio.gather(*pending)
 
-        async with data_lock:
-            rec = DATA["confessions"].get(str(cid))
-            if not rec:
-                return await interaction.response.send_message("❌ Confession not found.", ephemeral=True)
-
-            reply_obj = {
-                "content": text,
-                "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                "user_id": interaction.user.id,
-                "username": str(interaction.user)
-            }
-            rec["replies"].append(reply_obj)
-            save_data_atomic(DATA)
-
-        posted_somewhere = False
+        if posted_somewhere:
+            await interaction.followup.send("💬 Reply sent anonymously.", ephemeral=True)
+        else:
+            await interaction.followup.send("✅ Reply saved, but I couldn't post it.", ephemeral=True)
+
+    async def _post_reply(self, guild: discord.Guild, cid: int, rec: Confession, reply_embed: discord.Embed, confession_channel):
         try:
-            thread_id = rec.get("thread_id")
-            thread = guild.get_thread(int(thread_id)) if thread_id else None
+            thread = _get_thread(guild, int(rec.thread_id)) if rec.thread_id else None
 
             if thread is None:
                 thread = await self.confession_message.create_thread(
                     name=f"Replies #{cid}",
                     auto_archive_duration=1440
                 )
-                async with data_lock:
-                    rec["thread_id"] = thread.id
-                    save_data_atomic(DATA)
-
-            reply_embed = discord.Embed(
-                title=f"Anonymous Reply → Confession #{cid}",
-                description=f"“{text}”",
-                color=0x99AAB5,
-                timestamp=datetime.utcnow()
-            )
+                rec.thread_id = thread.id
+                _cache_thread(thread)
+                await asyncio.gather(
+                    commit_op({"op": "set_thread", "cid": cid, "thread_id": thread.id}),
+                    thread.send(embed=reply_embed, allowed_mentions=discord.AllowedMentions.none())
+                )
+                return True
+
             await thread.send(embed=reply_embed, allowed_mentions=discord.AllowedMentions.none())
-            posted_somewhere = True
+            return True
         except Exception:
             if confession_channel:
                 try:
-                    reply_embed = discord.Embed(
-                        title=f"Anonymous Reply → Confession #{cid}",
-                        description=f"“{text}”",
-                        color=0x99AAB5,
-                        timestamp=datetime.utcnow()
-                    )
                     await confession_channel.send(embed=reply_embed, allowed_mentions=discord.AllowedMentions.none())
-                    posted_somewhere = True
+                    return True
                 except Exception:
-                    posted_somewhere = False
-
-        if log_channel:
-            log_embed = discord.Embed(
-                title=f"🔒 Reply to Confession #{cid} — Log",
-                color=0xFEE75C,
-                timestamp=datetime.utcnow()
-            )
-            log_embed.add_field(name="Server", value=f"{guild.name} (`{guild.id}`)", inline=False)
-            log_embed.add_field(name="User", value=f"{interaction.user} (`{interaction.user.id}`)", inline=False)
-            log_embed.add_field(name="Reply", value=text[:1024], inline=False)
-            log_embed.add_field(
-                name="Confession Link",
-                value=f"[Jump]({rec.get('jump_url', self.confession_message.jump_url)})",
-                inline=False
-            )
-            log_embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            try:
-                await log_channel.send(embed=log_embed)
-            except Exception:
-                pass
-
-        if posted_somewhere:
-            await interaction.response.send_message("💬 Reply sent anonymously.", ephemeral=True)
-        else:
-            await interaction.response.send_message("✅ Reply saved, but I couldn't post it.", ephemeral=True)
+                    pass
+            return False
 
 
 class ConfessionPersistentView(ui.View):
@@ -349,14 +924,11 @@ class ConfessionPersistentView(ui.View):
         if message is None:
             return await interaction.response.send_message("❌ No message context.", ephemeral=True)
 
-        async with data_lock:
-            cid = DATA["message_to_confession"].get(str(message.id))
+        row = db.execute("SELECT cid FROM confessions WHERE message_id = ?", (message.id,)).fetchone()
+        cid = row["cid"] if row else None
 
         if cid is None and message.embeds:
-            title = message.embeds[0].title or ""
-            m = CONF_ID_RE.search(title)
-            if m:
-                cid = int(m.group(1))
+            cid = _extract_id(message.embeds[0].title or "")
 
         if cid is None:
             return await interaction.response.send_message("❌ I can't detect which confession this is.", ephemeral=True)
@@ -384,95 +956,93 @@ class SuggestionModal(ui.Modal, title="Submit a Suggestion"):
             return await interaction.response.send_message("❌ Use this inside a server.", ephemeral=True)
 
         guild = interaction.guild
-        async with data_lock:
-            cfg = get_guild_cfg(guild.id)
-            suggestion_channel_id = cfg.get("suggestion_channel_id")
-            log_channel_id = cfg.get("log_channel_id")
+        cfg = get_guild_cfg(guild.id)
+        suggestion_channel_id = cfg.get("suggestion_channel_id")
 
         if not suggestion_channel_id:
             return await interaction.response.send_message("❌ Suggestion panel not set. Run `!suggestionpanel` in the channel you want.", ephemeral=True)
 
-        suggestion_channel = guild.get_channel(int(suggestion_channel_id))
-        log_channel = guild.get_channel(int(log_channel_id)) if log_channel_id else None
+        suggestion_channel = cached_channel(guild, "suggestion_channel_id")
+        log_channel = cached_channel(guild, "log_channel_id")
 
         if suggestion_channel is None:
             return await interaction.response.send_message("❌ Suggestion channel not found. Run `!suggestionpanel` again.", ephemeral=True)
 
-        title = escape_mentions(self.title_in.value).strip()
-        text = escape_mentions(self.details.value).strip()
+        title = self.title_in.value.strip().translate(MENTION_SCRUB)
+        text = self.details.value.strip().translate(MENTION_SCRUB)
         if not title or not text:
             return await interaction.response.send_message("❌ Empty suggestion.", ephemeral=True)
 
-        async with data_lock:
-            DATA["suggestion_count"] += 1
-            sid = int(DATA["suggestion_count"])
-
-        embed = discord.Embed(
-            title=f"✨ Suggestion #{sid}",
-            description=f"**{title}**\n\n{text}",
-            color=0xEB459E,
-            timestamp=datetime.utcnow()
-        )
-        embed.set_author(name=str(interaction.user), icon_url=interaction.user.display_avatar.url)
-        embed.add_field(name="Status", value=f"**{status_label('pending')}**", inline=True)
-        embed.add_field(name="Votes", value="👍 0  |  👎 0", inline=True)
-        embed.add_field(name="Image", value="Use **Attach Image** or **No Image** below.", inline=False)
-        embed.set_footer(text="Vote below • Mods can update status")
-
-        msg = await suggestion_channel.send(embed=embed, view=SuggestionView())
-
-        async with data_lock:
-            DATA["suggestions"][str(sid)] = {
-                "guild_id": guild.id,
-                "title": title,
-                "content": text,
-                "status": "pending",
-                "user_id": interaction.user.id,
-                "username": str(interaction.user),
-                "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-                "message_id": msg.id,
-                "channel_id": suggestion_channel.id,
-                "jump_url": msg.jump_url,
-                "image_url": None,
-                "upvotes": [],
-                "downvotes": []
-            }
-            DATA["message_to_suggestion"][str(msg.id)] = sid
-            save_data_atomic(DATA)
-
+        user = interaction.user
+        user_str = str(user)
+        uid = user.id
+        avatar_url = user.display_avatar.url
+
+        DATA["suggestion_count"] += 1
+        sid = int(DATA["suggestion_count"])
+        counted = log_event({("suggestion_count",): sid})
+
+        now = discord.utils.utcnow()
+        now_iso = now.isoformat()
+        embed = discord.Embed.from_dict({
+            "title": f"✨ Suggestion #{sid}",
+            "description": f"**{title}**\n\n{text}",
+            "color": 0xEB459E,
+            "timestamp": now_iso,
+            "author": {"name": user_str, "icon_url": avatar_url},
+            "fields": [
+                {"name": "Status", "value": f"**{status_label('pending')}**", "inline": True},
+                {"name": "Votes", "value": "👍 0  |  👎 0", "inline": True},
+                {"name": "Image", "value": "Use **Attach Image** or **No Image** below.", "inline": False},
+            ],
+            "footer": {"text": "Vote below • Mods can update status"}
+        })
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        msg = await suggestion_channel.send(embed=embed, view=interaction.client.suggestion_view)
+
+        jump_url = msg.jump_url
+        committed = add_suggestion(sid, Suggestion(
+            guild_id=guild.id,
+            title=title,
+            content=text,
+            user_id=uid,
+            username=user_str,
+            timestamp=_ts(now),
+            message_id=msg.id,
+            channel_id=suggestion_channel.id,
+            jump_url=jump_url,
+            upvotes=set(),
+            downvotes=set()
+        ))
+
+        pending = [counted, committed, interaction.followup.send("✅ Posted! On your suggestion, press **Attach Image** or **No Image**.", ephemeral=True)]
         if log_channel:
-            log_embed = discord.Embed(
-                title=f"📥 Suggestion #{sid} — Log",
-                color=0x57F287,
-                timestamp=datetime.utcnow()
-            )
-            log_embed.add_field(name="Server", value=f"{guild.name} (`{guild.id}`)", inline=False)
-            log_embed.add_field(name="User", value=f"{interaction.user} (`{interaction.user.id}`)", inline=False)
-            log_embed.add_field(name="Title", value=title, inline=False)
-            log_embed.add_field(name="Suggestion", value=text[:1024], inline=False)
-            log_embed.add_field(name="Message Link", value=f"[Jump]({msg.jump_url})", inline=False)
-            log_embed.set_thumbnail(url=interaction.user.display_avatar.url)
-            try:
-                await log_channel.send(embed=log_embed)
-            except Exception:
-                pass
-
-        await interaction.response.send_message("✅ Posted! On your suggestion, press **Attach Image** or **No Image**.", ephemeral=True)
+            log_embed = discord.Embed.from_dict({
+                "title": f"📥 Suggestion #{sid} — Log",
+                "color": 0x57F287,
+                "timestamp": now_iso,
+                "fields": [
+                    {"name": "Server", "value": f"{guild.name} (`{guild.id}`)", "inline": False},
+                    {"name": "User", "value": f"{user_str} (`{uid}`)", "inline": False},
+                    {"name": "Title", "value": title, "inline": False},
+                    {"name": "Suggestion", "value": text[:1024], "inline": False},
+                    {"name": "Message Link", "value": f"[Jump]({jump_url})", "inline": False},
+                ],
+                "thumbnail": {"url": avatar_url}
+            })
+            post_log(log_channel, log_embed)
+
+        await asyncio.gather(*pending)
 
 
 class SuggestionStatusSelect(ui.Select):
     def __init__(self):
-        options = [
-            discord.SelectOption(label="Pending Review", value="pending", emoji="🟨"),
-            discord.SelectOption(label="Approved", value="approved", emoji="🟩"),
-            discord.SelectOption(label="Denied", value="denied", emoji="🟥"),
-            discord.SelectOption(label="Implemented", value="implemented", emoji="✅"),
-        ]
         super().__init__(
             placeholder="🛠️ Moderator: Update status…",
             min_values=1,
             max_values=1,
-            options=options,
+            options=STATUS_OPTIONS,
             custom_id="suggestion:status_select"
         )
 
@@ -484,14 +1054,10 @@ class SuggestionStatusSelect(ui.Select):
         if message is None or not message.embeds:
             return await interaction.response.send_message("❌ Missing embed.", ephemeral=True)
 
-        async with data_lock:
-            sid = DATA["message_to_suggestion"].get(str(message.id))
+        sid = DATA["message_to_suggestion"].get(message.id)
 
         if sid is None:
-            t = message.embeds[0].title or ""
-            m = SUGG_ID_RE.search(t)
-            if m:
-                sid = int(m.group(1))
+            sid = _extract_id(message.embeds[0].title or "")
 
         if sid is None:
             return await interaction.response.send_message("❌ Can't detect suggestion ID.", ephemeral=True)
@@ -499,26 +1065,20 @@ class SuggestionStatusSelect(ui.Select):
         new_status = self.values[0]
         label = status_label(new_status)
 
-        e = message.embeds[0]
-        fields = [(f.name, f.value, f.inline) for f in e.fields]
-        updated = False
-        for i, (name, value, inline) in enumerate(fields):
-            if name.lower() == "status":
-                fields[i] = ("Status", f"**{label}**", True)
-                updated = True
-                break
-        if not updated:
-            fields.insert(0, ("Status", f"**{label}**", True))
-
-        new_embed = _rebuild_embed_from(e, fields=fields)
+        embed = message.embeds[0]
+        if not _set_known_field(embed, STATUS_FIELD_IDX, "Status", f"**{label}**"):
+            embed.insert_field_at(STATUS_FIELD_IDX, name="Status", value=f"**{label}**", inline=True)
 
-        async with data_lock:
-            rec = DATA["suggestions"].get(str(sid))
-            if rec:
-                rec["status"] = new_status
-                save_data_atomic(DATA)
+        rec = DATA["suggestions"].get(sid)
+        pending = []
+        if rec:
+            rec.status = new_status
+            # this message's embed may predate a vote edit that hasn't flushed yet
+            _refresh_suggestion_embed(embed, rec)
+            pending.append(touch_suggestion(sid))
+        pending.append(message.edit(embed=embed, view=interaction.client.suggestion_view))
 
-        await message.edit(embed=new_embed, view=SuggestionView())
+        await asyncio.gather(*pending)
         await interaction.response.send_message(f"✅ Status updated to **{label}**.", ephemeral=True)
 
 
@@ -542,16 +1102,15 @@ class SuggestionView(ui.View):
             return await interaction.response.send_message("❌ Missing context.", ephemeral=True)
 
         guild = interaction.guild
-        async with data_lock:
-            sid = DATA["message_to_suggestion"].get(str(msg.id))
-            rec = DATA["suggestions"].get(str(sid)) if sid else None
-            cfg = get_guild_cfg(guild.id)
-            suggestion_channel_id = cfg.get("suggestion_channel_id")
+        sid = DATA["message_to_suggestion"].get(msg.id)
+        rec = DATA["suggestions"].get(sid) if sid else None
+        cfg = get_guild_cfg(guild.id)
+        suggestion_channel_id = cfg.get("suggestion_channel_id")
 
         if not sid or not rec:
             return await interaction.response.send_message("❌ Can't detect this suggestion.", ephemeral=True)
 
-        is_owner = rec.get("user_id") == interaction.user.id
+        is_owner = rec.user_id == interaction.user.id
         is_mod = isinstance(interaction.user, discord.Member) and interaction.user.guild_permissions.manage_guild
         if not (is_owner or is_mod):
             return await interaction.response.send_message("❌ Only the suggester (or a mod) can attach an image.", ephemeral=True)
@@ -559,7 +1118,7 @@ class SuggestionView(ui.View):
         if not suggestion_channel_id or int(suggestion_channel_id) != msg.channel.id:
             return await interaction.response.send_message("❌ This suggestion is not in the configured suggestion channel.", ephemeral=True)
 
-        await _set_pending_image(guild.id, msg.channel.id, msg.id, rec.get("user_id"))
+        _set_pending_image(guild.id, msg.channel.id, msg.id, sid, rec.user_id, msg.embeds[0] if msg.embeds else None)
         await interaction.response.send_message("🖼️ Send an image in this channel now — I’ll attach it to your latest suggestion.", ephemeral=True)
 
     @ui.button(label="No Image", emoji="🚫", style=discord.ButtonStyle.secondary, custom_id="suggestion:no_image")
@@ -568,19 +1127,18 @@ class SuggestionView(ui.View):
         if not msg or not interaction.guild:
             return await interaction.response.send_message("❌ Missing context.", ephemeral=True)
 
-        async with data_lock:
-            sid = DATA["message_to_suggestion"].get(str(msg.id))
-            rec = DATA["suggestions"].get(str(sid)) if sid else None
+        sid = DATA["message_to_suggestion"].get(msg.id)
+        rec = DATA["suggestions"].get(sid) if sid else None
 
         if not sid or not rec:
             return await interaction.response.send_message("❌ Can't detect this suggestion.", ephemeral=True)
 
-        is_owner = rec.get("user_id") == interaction.user.id
+        is_owner = rec.user_id == interaction.user.id
         is_mod = isinstance(interaction.user, discord.Member) and interaction.user.guild_permissions.manage_guild
         if not (is_owner or is_mod):
             return await interaction.response.send_message("❌ Only the suggester (or a mod) can choose this.", ephemeral=True)
 
-        await _clear_pending_image(interaction.guild.id, msg.id)
+        _clear_pending_image(interaction.guild.id, msg.id)
         await interaction.response.send_message("✅ Got it — no image will be attached.", ephemeral=True)
 
     @ui.button(label="Open", emoji="🔗", style=discord.ButtonStyle.secondary, custom_id="suggestion:link")
@@ -595,60 +1153,37 @@ class SuggestionView(ui.View):
         if msg is None or not msg.embeds:
             return await interaction.response.send_message("❌ Missing embed.", ephemeral=True)
 
-        async with data_lock:
-            sid = DATA["message_to_suggestion"].get(str(msg.id))
-            if sid is None:
-                t = msg.embeds[0].title or ""
-                m = SUGG_ID_RE.search(t)
-                if m:
-                    sid = int(m.group(1))
-
-            if sid is None:
-                return await interaction.response.send_message("❌ Can't detect suggestion ID.", ephemeral=True)
-
-            rec = DATA["suggestions"].get(str(sid))
-            if not rec:
-                return await interaction.response.send_message("❌ Suggestion not found.", ephemeral=True)
-
-            uid = interaction.user.id
-            upvotes = set(rec.get("upvotes", []))
-            downvotes = set(rec.get("downvotes", []))
-
-            if up:
-                if uid in upvotes:
-                    upvotes.remove(uid)
-                else:
-                    upvotes.add(uid)
-                    downvotes.discard(uid)
+        sid = DATA["message_to_suggestion"].get(msg.id)
+        if sid is None:
+            sid = _extract_id(msg.embeds[0].title or "")
+
+        if sid is None:
+            return await interaction.response.send_message("❌ Can't detect suggestion ID.", ephemeral=True)
+
+        rec = DATA["suggestions"].get(sid)
+        if not rec:
+            return await interaction.response.send_message("❌ Suggestion not found.", ephemeral=True)
+
+        uid = interaction.user.id
+        upvotes = rec.upvotes
+        downvotes = rec.downvotes
+
+        if up:
+            if uid in upvotes:
+                upvotes.remove(uid)
             else:
-                if uid in downvotes:
-                    downvotes.remove(uid)
-                else:
-                    downvotes.add(uid)
-                    upvotes.discard(uid)
-
-            rec["upvotes"] = list(upvotes)
-            rec["downvotes"] = list(downvotes)
-            save_data_atomic(DATA)
-
-            up_count = len(rec["upvotes"])
-            down_count = len(rec["downvotes"])
-
-        e = msg.embeds[0]
-        fields = [(f.name, f.value, f.inline) for f in e.fields]
-        votes_value = f"👍 {up_count}  |  👎 {down_count}"
-
-        updated = False
-        for i, (name, value, inline) in enumerate(fields):
-            if name.lower() == "votes":
-                fields[i] = ("Votes", votes_value, True)
-                updated = True
-                break
-        if not updated:
-            fields.append(("Votes", votes_value, True))
+                upvotes.add(uid)
+                downvotes.discard(uid)
+        else:
+            if uid in downvotes:
+                downvotes.remove(uid)
+            else:
+                downvotes.add(uid)
+                upvotes.discard(uid)
 
-        new_embed = _rebuild_embed_from(e, fields=fields)
-        await msg.edit(embed=new_embed, view=SuggestionView())
+        saved = touch_suggestion(sid)
+        schedule_vote_edit(sid, msg, msg.embeds[0])
+        await saved
         await interaction.response.send_message("✅ Vote updated.", ephemeral=True)
 
 
@@ -675,12 +1210,33 @@ class SuggestionPanelView(ui.View):
 
 class HiraBot(commands.Bot):
     async def setup_hook(self):
-        self.add_view(ConfessionPersistentView())
-        self.add_view(SuggestionView())
-        self.add_view(SuggestionPanelView())
-
-
-bot = HiraBot(command_prefix="!", intents=discord.Intents.all())
+        self.confession_view = ConfessionPersistentView()
+        self.add_view(self.confession_view)
+        self.suggestion_view = SuggestionView()
+        self.add_view(self.suggestion_view)
+        self.suggestion_panel_view = SuggestionPanelView()
+        self.add_view(self.suggestion_panel_view)
+        self.flush_task = asyncio.create_task(_wal_flusher())
+        self.save_task = asyncio.create_task(_snapshot_flusher())
+        self.log_task = asyncio.create_task(_log_sender())
+
+    async def close(self):
+        await flush_data()
+        await super().close()
+
+
+intents = discord.Intents.none()
+intents.guilds = True
+intents.guild_messages = True
+intents.message_content = True
+
+bot = HiraBot(
+    command_prefix="!",
+    intents=intents,
+    max_messages=None,
+    chunk_guilds_at_startup=False,
+    member_cache_flags=discord.MemberCacheFlags.none()
+)
 
 
 @bot.event
@@ -689,151 +1245,166 @@ async def on_ready():
 
 
 @bot.event
-async def on_message(message: discord.Message):
-    await bot.process_commands(message)
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    for key in [k for k, v in _channel_cache.items() if v.id == channel.id]:
+        _channel_cache.pop(key, None)
 
+
+@bot.event
+async def on_raw_thread_delete(payload: discord.RawThreadDeleteEvent):
+    _thread_cache.pop(payload.thread_id, None)
+
+
+@bot.event
+async def on_thread_update(before: discord.Thread, after: discord.Thread):
+    if after.id in _thread_cache:
+        _thread_cache[after.id] = after
+
+
+@bot.event
+async def on_message(message: discord.Message):
     if message.author.bot:
         return
+    if message.content.startswith(bot.command_prefix):
+        await bot.process_commands(message)
+
     if not message.guild:
         return
     if not message.attachments:
         return
+    if not PENDING_IMAGE:
+        return
 
-    async with data_lock:
-        cfg = get_guild_cfg(message.guild.id)
-        suggestion_channel_id = cfg.get("suggestion_channel_id")
+    # plain lookup: chat in unconfigured guilds shouldn't grow guild_config
+    suggestion_channel_id = DATA["guild_config"].get(message.guild.id, {}).get("suggestion_channel_id")
 
     if not suggestion_channel_id:
         return
     if message.channel.id != int(suggestion_channel_id):
         return
 
-    await _clean_expired_pending()
+    _clean_expired_pending()
 
     target_suggestion_message_id = None
 
     if message.reference and message.reference.message_id:
         ref_id = int(message.reference.message_id)
-        async with PENDING_IMAGE_LOCK:
-            key = (message.guild.id, ref_id)
-            pending = PENDING_IMAGE.get(key)
-            if pending and pending["user_id"] == message.author.id and pending["channel_id"] == message.channel.id:
-                target_suggestion_message_id = ref_id
+        pending = PENDING_IMAGE.get((message.guild.id, ref_id))
+        if pending and pending["user_id"] == message.author.id and pending["channel_id"] == message.channel.id:
+            target_suggestion_message_id = ref_id
 
     if target_suggestion_message_id is None:
-        pending_list = await _find_pending_for_user(message.guild.id, message.channel.id, message.author.id)
-        if not pending_list:
+        pending = _find_pending_for_user(message.guild.id, message.channel.id, message.author.id)
+        if pending is None:
             return
-        target_suggestion_message_id = int(pending_list[0]["message_id"])
+        target_suggestion_message_id = int(pending["message_id"])
 
     attachment = message.attachments[0]
 
-    async with data_lock:
-        sid = DATA["message_to_suggestion"].get(str(target_suggestion_message_id))
-        rec = DATA["suggestions"].get(str(sid)) if sid else None
-        if not sid or not rec:
-            await _clear_pending_image(message.guild.id, target_suggestion_message_id)
-            return
-        rec["image_url"] = attachment.url
-        save_data_atomic(DATA)
-
-    try:
-        suggestion_msg = await message.channel.fetch_message(target_suggestion_message_id)
-        if suggestion_msg and suggestion_msg.embeds:
-            e = suggestion_msg.embeds[0]
-            fields = [(f.name, f.value, f.inline) for f in e.fields]
-            new_embed = _rebuild_embed_from(e, fields=fields)
-            new_embed.set_image(url=attachment.url)
-            await suggestion_msg.edit(embed=new_embed, view=SuggestionView())
-    except Exception:
-        pass
-
-    await _clear_pending_image(message.guild.id, target_suggestion_message_id)
-
-    try:
-        await message.delete()
-    except Exception:
-        pass
+    # resolved when Attach Image was pressed, so the message->suggestion lookup isn't repeated here
+    sid = pending["sid"]
+    rec = DATA["suggestions"].get(sid) if sid else None
+    if not sid or not rec:
+        _clear_pending_image(message.guild.id, target_suggestion_message_id)
+        return
+    # consume the pending entry in the same step as the image write, before any await,
+    # so a second upload can't claim it while the edit below is in flight
+    rec.image_url = attachment.url
+    _clear_pending_image(message.guild.id, target_suggestion_message_id)
+
+    # the WAL write, the suggestion edit and the upload's deletion don't depend on each other
+    pending_calls = [touch_suggestion(sid), _send_quietly(message.delete)]
+    embed = pending["embed"]
+    if embed is not None:
+        # votes/status may have changed since Attach Image was pressed
+        _refresh_suggestion_embed(embed, rec)
+        suggestion_msg = message.channel.get_partial_message(target_suggestion_message_id)
+        pending_calls.append(_send_quietly(suggestion_msg.edit, embed=embed, view=bot.suggestion_view))
+    await asyncio.gather(*pending_calls)
+
+
+def admin_guild_only():
+    return commands.check(lambda ctx: ctx.guild is not None and ctx.author.guild_permissions.administrator)
+
+
+# panel embeds never change, so they are built once and reused by every command
+CONFESSION_PANEL_EMBED = discord.Embed.from_dict({
+    "title": "💌 Anonymous Confessions",
+    "description": "Click **Submit a confession!** to post anonymously.\nUse **Reply** under a confession to reply anonymously.",
+    "color": 0x57F287,
+    "footer": {"text": "This channel is now the confession channel for this server."}
+})
+SUGGESTION_PANEL_EMBED = discord.Embed.from_dict({
+    "title": "✨ Suggestions Box",
+    "description": "Drop ideas to improve the server.\n\n💡 Submit an idea\n👍 Community votes\n🛠️ Mods set status\n🖼️ Attach Image / No Image buttons on your post",
+    "color": 0xEB459E,
+    "footer": {"text": "This channel is now the suggestion channel for this server."}
+})
+LOG_PANEL_EMBED = discord.Embed.from_dict({
+    "title": "🧾 Logs Enabled",
+    "description": "This channel is now the log channel for confessions + suggestions.",
+    "color": 0x5865F2
+})
 
 
 @bot.command(name="panel")
-@commands.has_permissions(administrator=True)
+@admin_guild_only()
 async def panel(ctx: commands.Context):
-    if not ctx.guild:
-        return
-    async with data_lock:
-        set_guild_cfg(ctx.guild.id, confession_channel_id=ctx.channel.id)
-        save_data_atomic(DATA)
-    embed = discord.Embed(
-        title="💌 Anonymous Confessions",
-        description="Click **Submit a confession!** to post anonymously.\nUse **Reply** under a confession to reply anonymously.",
-        color=0x57F287
-    )
-    embed.set_footer(text="This channel is now the confession channel for this server.")
-    await ctx.send(embed=embed, view=ConfessionPersistentView())
+    await set_guild_cfg(ctx.guild.id, confession_channel_id=ctx.channel.id)
+    await ctx.send(embed=CONFESSION_PANEL_EMBED, view=bot.confession_view)
 
 
 @bot.command(name="suggestionpanel")
-@commands.has_permissions(administrator=True)
+@admin_guild_only()
 async def suggestionpanel(ctx: commands.Context):
-    if not ctx.guild:
-        return
-    async with data_lock:
-        set_guild_cfg(ctx.guild.id, suggestion_channel_id=ctx.channel.id)
-        save_data_atomic(DATA)
-    embed = discord.Embed(
-        title="✨ Suggestions Box",
-        description="Drop ideas to improve the server.\n\n💡 Submit an idea\n👍 Community votes\n🛠️ Mods set status\n🖼️ Attach Image / No Image buttons on your post",
-        color=0xEB459E
-    )
-    embed.set_footer(text="This channel is now the suggestion channel for this server.")
-    await ctx.send(embed=embed, view=SuggestionPanelView())
+    await set_guild_cfg(ctx.guild.id, suggestion_channel_id=ctx.channel.id)
+    await ctx.send(embed=SUGGESTION_PANEL_EMBED, view=bot.suggestion_panel_view)
 
 
 @bot.command(name="panel2")
-@commands.has_permissions(administrator=True)
+@admin_guild_only()
 async def panel2(ctx: commands.Context):
-    if not ctx.guild:
-        return
-    async with data_lock:
-        set_guild_cfg(ctx.guild.id, log_channel_id=ctx.channel.id)
-        save_data_atomic(DATA)
-    embed = discord.Embed(
-        title="🧾 Logs Enabled",
-        description="This channel is now the log channel for confessions + suggestions.",
-        color=0x5865F2
-    )
-    await ctx.send(embed=embed)
+    await set_guild_cfg(ctx.guild.id, log_channel_id=ctx.channel.id)
+    await ctx.send(embed=LOG_PANEL_EMBED)
 
 
 @bot.command(name="rebuildmap")
-@commands.has_permissions(administrator=True)
+@admin_guild_only()
 async def rebuildmap(ctx: commands.Context):
-    rebuilt = 0
-    async with data_lock:
-        DATA["message_to_confession"] = {}
-        for cid_str, rec in DATA["confessions"].items():
-            mid = rec.get("message_id")
-            if mid:
-                DATA["message_to_confession"][str(mid)] = int(cid_str)
-                rebuilt += 1
-        save_data_atomic(DATA)
+    await commit_op({"op": "reindex"})
+    # the count scans the whole index, so it runs on the writer thread rather than the event loop
+    rebuilt = await _run_io(_count_mapped_confessions)
     await ctx.send(f"✅ Rebuilt mapping for `{rebuilt}` confessions.")
 
 
 @bot.command(name="rebuildsuggestmap")
-@commands.has_permissions(administrator=True)
+@admin_guild_only()
 async def rebuildsuggestmap(ctx: commands.Context):
-    rebuilt = 0
-    async with data_lock:
-        DATA["message_to_suggestion"] = {}
-        for sid_str, rec in DATA["suggestions"].items():
-            mid = rec.get("message_id")
-            if mid:
-                DATA["message_to_suggestion"][str(mid)] = int(sid_str)
-                rebuilt += 1
-        save_data_atomic(DATA)
+    global _suggestion_map_gen
+    if _suggestion_map_gen == _suggestions_gen:
+        return await ctx.send(f"✅ Mapping already up to date for `{len(DATA['message_to_suggestion'])}` suggestions.")
+    gen = _suggestions_gen
+    records = list(DATA["suggestions"].items())
+    new_map = await asyncio.to_thread(_build_map, records)
+    if _suggestions_gen != gen:
+        # suggestions are never removed, so anything posted during the build sits past the copied prefix
+        new_map.update(_build_map(list(DATA["suggestions"].items())[len(records):]))
+    DATA["message_to_suggestion"] = new_map
+    _suggestion_map_gen = _suggestions_gen
+    await log_event({("message_to_suggestion",): new_map}, sync=False)
+    rebuilt = len(new_map)
     await ctx.send(f"✅ Rebuilt mapping for `{rebuilt}` suggestions.")
 
 
-bot.run(TOKEN)
+async def main():
+    async with bot:
+        await bot.start(TOKEN)
+
+
+if uvloop is not None:
+    # bot.run builds its own stock loop, so drive start() on a uvloop runner and keep run()'s logging
+    discord.utils.setup_logging()
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+        runner.run(main())
+else:
+    bot.run(TOKEN)
@@ -0,0 +1,229 @@
+import asyncio
+import importlib
+import itertools
+import json
+import random
+import sys
+from pathlib import Path
+
+import discord
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# the on-disk shape written by the original single-file JSON store
+LEGACY_DATA = {
+    "confession_count": 1,
+    "confessions": {
+        "1": {
+            "content": "hello",
+            "user_id": 42,
+            "username": "user#0001",
+            "account_created": "2020-01-01",
+            "timestamp": "2024-01-01 00:00:00",
+            "message_id": 555,
+            "channel_id": 10,
+            "guild_id": 1,
+            "jump_url": "https://discord.com/channels/1/10/555",
+            "thread_id": None,
+            "replies": [
+                {"content": "hi", "timestamp": "2024-01-01 00:01:00", "user_id": 43, "username": "other#0002"}
+            ]
+        }
+    },
+    "message_to_confession": {"555": 1},
+    "suggestion_count": 1,
+    "suggestions": {
+        "1": {
+            "guild_id": 1,
+            "title": "T",
+            "content": "D",
+            "status": "approved",
+            "user_id": 42,
+            "username": "user#0001",
+            "timestamp": "2024-01-01 00:00:00",
+            "message_id": 777,
+            "channel_id": 11,
+            "jump_url": "https://discord.com/channels/1/11/777",
+            "image_url": None,
+            "upvotes": [43, 44],
+            "downvotes": [45]
+        }
+    },
+    "message_to_suggestion": {"777": 1},
+    "guild_config": {"1": {"confession_channel_id": 10, "suggestion_channel_id": 11}}
+}
+
+
+@pytest.fixture(scope="module")
+def workdir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data")
+    (path / "confessions.json").write_text(json.dumps(LEGACY_DATA), encoding="utf-8")
+    return path
+
+
+@pytest.fixture(scope="module")
+def hb(workdir):
+    # importing the bot boots it: load, migrate and compact run against the legacy file in workdir
+    mp = pytest.MonkeyPatch()
+    mp.setenv("DISCORD_TOKEN", "test")
+    mp.setattr(discord.Client, "run", lambda self, *args, **kwargs: None)
+    mp.chdir(workdir)
+    mp.syspath_prepend(str(ROOT))
+    sys.modules.pop("hirayabot", None)
+    module = importlib.import_module("hirayabot")
+    yield module
+    module.db.close()
+    module.db_writer.close()
+    sys.modules.pop("hirayabot", None)
+    mp.undo()
+
+
+@pytest.mark.parametrize("ids", [
+    set(),
+    {0},
+    {1, 2, 3, 127, 128, 16383, 16384},
+    {1_100_000_000_000_000_000},
+])
+def test_pack_ids_round_trip(hb, ids):
+    assert hb._unpack_ids(hb._pack_ids(ids)) == ids
+
+
+def test_pack_ids_round_trip_snowflakes(hb):
+    rng = random.Random(0)
+    ids = {rng.randrange(10**17, 2**63) for _ in range(1000)}
+    packed = hb._pack_ids(ids)
+    assert hb._load_ids(packed) == ids
+    assert len(packed) < len(json.dumps(sorted(ids)))
+
+
+def test_load_ids_accepts_legacy_lists(hb):
+    assert hb._load_ids([5, 3, 5]) == {3, 5}
+    assert hb._load_ids([]) == set()
+    assert hb._load_ids(None) == set()
+    assert hb._load_ids("") == set()
+
+
+def test_replay_skips_applied_seqs_and_stops_at_torn_tail(hb, tmp_path, monkeypatch):
+    wal = tmp_path / "confessions.wal"
+    ops = [
+        {"op": "put", "seq": 1, "puts": [[["guild_config", 9, "log_channel_id"], 1]]},
+        {"op": "put", "seq": 2, "puts": [[["guild_config", 5, "log_channel_id"], 12]]},
+        {"op": "put", "seq": 3, "puts": [[["suggestion_count"], 3]]},
+    ]
+    torn = b'{"op": "put", "seq": 4, "puts": [[["suggestion_c'
+    wal.write_bytes(b"".join(json.dumps(op).encode() + b"\n" for op in ops) + torn)
+    monkeypatch.setattr(hb, "WAL_FILE", str(wal))
+
+    data = hb._default_data()
+    data["wal_seq"] = 1
+    hb._replay_wal(data)
+
+    assert data["guild_config"] == {5: {"log_channel_id": 12}}
+    assert data["suggestion_count"] == 3
+    assert data["wal_seq"] == 3
+
+
+def test_replay_without_wal_is_a_no_op(hb, tmp_path, monkeypatch):
+    monkeypatch.setattr(hb, "WAL_FILE", str(tmp_path / "missing.wal"))
+    data = hb._default_data()
+    assert hb._replay_wal(data) == hb._default_data()
+
+
+def test_replay_applies_lines_behind_a_later_seq(hb, tmp_path, monkeypatch):
+    wal = tmp_path / "confessions.wal"
+    ops = [
+        {"op": "put", "seq": 3, "puts": [[["suggestion_count"], 3]]},
+        {"op": "put", "seq": 2, "puts": [[["guild_config", 5, "log_channel_id"], 12]]},
+    ]
+    wal.write_bytes(b"".join(json.dumps(op).encode() + b"\n" for op in ops))
+    monkeypatch.setattr(hb, "WAL_FILE", str(wal))
+
+    data = hb._default_data()
+    data["wal_seq"] = 1
+    hb._replay_wal(data)
+
+    assert data["guild_config"] == {5: {"log_channel_id": 12}}
+    assert data["suggestion_count"] == 3
+    assert data["wal_seq"] == 3
+
+
+def test_flushed_batch_replays_eager_events_after_a_dirty_suggestion(hb, tmp_path, monkeypatch):
+    monkeypatch.setattr(hb, "WAL_FILE", str(tmp_path / "confessions.wal"))
+    monkeypatch.setattr(hb, "DATA", hb._default_data())
+    monkeypatch.setattr(hb, "_event_seq", itertools.count(1))
+    monkeypatch.setattr(hb, "_dirty_suggestions", {})
+    monkeypatch.setattr(hb, "_wal_fh", None)
+    rec = hb.Suggestion(
+        guild_id=5, title="T", content="D", user_id=42, username="user#0001",
+        timestamp="2024-01-01 00:00:00", message_id=888, channel_id=11,
+        jump_url="https://discord.com/channels/5/11/888", upvotes=set(), downvotes=set()
+    )
+
+    async def run():
+        monkeypatch.setattr(hb, "flush_queue", asyncio.Queue())
+        flusher = asyncio.create_task(hb._wal_flusher())
+        # one tick: the vote's record is encoded at flush time, after the config change took its seq
+        pending = [hb.add_suggestion(2, rec)]
+        rec.upvotes.add(7)
+        pending.append(hb.touch_suggestion(2))
+        pending.append(hb.set_guild_cfg(5, log_channel_id=1234))
+        await asyncio.gather(*pending)
+        flusher.cancel()
+        hb._wal_fh.close()
+
+    asyncio.run(run())
+
+    data = hb._replay_wal(hb._default_data())
+    assert data["guild_config"] == {5: {"log_channel_id": 1234}}
+    assert data["message_to_suggestion"] == {888: 2}
+    assert hb._load_suggestion(data["suggestions"][2]) == rec
+    assert data["wal_seq"] == 3
+
+
+def test_int_keys(hb):
+    data = hb._default_data()
+    data["suggestions"] = {"3": {}}
+    data["message_to_suggestion"] = {"777": 3}
+    data["guild_config"] = {"1": {}}
+    hb._int_keys(data)
+    assert data["suggestions"] == {3: {}}
+    assert data["message_to_suggestion"] == {777: 3}
+    assert data["guild_config"] == {1: {}}
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("✨ Suggestion #12", 12),
+    ("Anonymous Confession (#7)", 7),
+    ("No id here", None),
+    ("#abc", None),
+    ("", None),
+])
+def test_extract_id(hb, title, expected):
+    assert hb._extract_id(title) == expected
+
+
+def test_boot_loads_legacy_snapshot(hb, workdir):
+    assert "confessions" not in hb.DATA
+    assert "message_to_confession" not in hb.DATA
+    assert hb.DATA["message_to_suggestion"] == {777: 1}
+    assert hb.DATA["guild_config"] == {1: {"confession_channel_id": 10, "suggestion_channel_id": 11}}
+
+    rec = hb.DATA["suggestions"][1]
+    assert isinstance(rec, hb.Suggestion)
+    assert rec.status == "approved"
+    assert rec.upvotes == {43, 44}
+    assert rec.downvotes == {45}
+
+    conf = hb.load_confession(1)
+    assert conf.message_id == 555
+    assert conf.content == "hello"
+    replies = hb.db.execute("SELECT content, user_id FROM replies WHERE cid = 1").fetchall()
+    assert [tuple(r) for r in replies] == [("hi", 43)]
+    assert next(hb._confession_counter) == 2
+
+    # migration rewrites the snapshot, so the next boot reads the compressed file
+    assert (workdir / hb.DATA_FILE).exists()
+    reloaded = hb._int_keys(hb._load_snapshot())
+    assert "confessions" not in reloaded
+    assert hb._load_suggestion(reloaded["suggestions"][1]) == rec